@@ -3,33 +3,82 @@ FastAPI Backend Application
 Main application for the Educational Content Assistant.
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-import shutil
+import aiofiles
+import asyncio
+import hashlib
+import orjson
 import os
+import uuid
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
 
 from pdf_loader import load_pdf
-from vector_store import create_vector_store, search_vector_store
-from rag_pipeline import build_query, format_context
+from vector_store import (
+    create_vector_store,
+    search_vector_store,
+    search_vector_store_batch,
+    save_vector_store,
+    load_vector_store,
+    clear_query_cache,
+    get_embeddings
+)
 from modes import get_available_modes
 from scaledown_client import generate_answer, get_api_key
 from dotenv import load_dotenv
 
+# Redis is optional: without it, history stays in-process and the app
+# behaves exactly as before (single-worker)
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 # Load environment variables
 load_dotenv()
 
-# Initialize FastAPI app
-app = FastAPI(title="Educational Content Assistant")
+# Shared history store for multi-worker deployments (REDIS_URL unset ->
+# in-process fallback)
+REDIS_URL = os.getenv("REDIS_URL")
+redis_client = aioredis.from_url(REDIS_URL) if (aioredis and REDIS_URL) else None
+
+# Cap on stored conversation turns per session
+HISTORY_LIMIT = 1000
+
+# Cap on distinct sessions kept by the in-process history fallback
+MAX_SESSIONS = 100
+
+# Completed ingestion jobs kept around for late polls before eviction
+MAX_FINISHED_JOBS = 50
+
+# Initialize FastAPI app (orjson serializes responses several times
+# faster than the stdlib json encoder)
+app = FastAPI(
+    title="Educational Content Assistant",
+    default_response_class=ORJSONResponse
+)
 
 # Create uploads directory
 UPLOAD_DIR = Path(__file__).parent.parent / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Create index cache directory (built indexes keyed by PDF content hash)
+INDEX_CACHE_DIR = Path(__file__).parent.parent / "index_cache"
+INDEX_CACHE_DIR.mkdir(exist_ok=True)
+
+# Pointer to the most recently ingested index, shared across workers
+LATEST_INDEX_FILE = INDEX_CACHE_DIR / "latest.json"
+
+# Ingestion job state, one file per job so any worker can serve polls
+JOBS_DIR = INDEX_CACHE_DIR / "jobs"
+JOBS_DIR.mkdir(exist_ok=True)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -42,10 +91,157 @@ app.add_middleware(
 # Mount static files (optional, comment out if not serving from backend)
 # app.mount("/static", StaticFiles(directory="../frontend"), name="static")
 
-# Global state
+# One conversation turn; a namedtuple is a fraction of the footprint of
+# a per-item dict and is immutable once recorded
+HistoryItem = namedtuple("HistoryItem", "question answer mode timestamp")
+
+# Global state (per worker; the shared source of truth is the on-disk
+# index pointer plus Redis when configured)
 vector_store = None
 current_pdf = None
-conversation_history = []
+current_index_hash = None
+conversation_histories = OrderedDict()  # session id -> deque of HistoryItem, LRU order
+
+# Guards the vector_store/current_pdf swap now that /ask runs concurrently
+vector_store_lock = asyncio.Lock()
+
+# Guards conversation_histories mutations from concurrent /ask calls
+history_lock = asyncio.Lock()
+
+
+def _write_latest_pointer(content_hash, filename):
+    """Atomically publish which cached index is current."""
+    tmp_path = LATEST_INDEX_FILE.with_suffix(".tmp")
+    tmp_path.write_bytes(orjson.dumps({"hash": content_hash, "filename": filename}))
+    os.replace(tmp_path, LATEST_INDEX_FILE)
+
+
+def _read_latest_pointer():
+    """Read the shared index pointer, or None if nothing was ingested yet."""
+    try:
+        return orjson.loads(LATEST_INDEX_FILE.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+
+def _job_path(job_id):
+    """Path of the shared state file for an ingestion job."""
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def _write_job(job):
+    """Atomically publish a job's state so any worker can serve polls."""
+    path = _job_path(job["job_id"])
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(orjson.dumps(job))
+    os.replace(tmp_path, path)
+
+
+def _read_job(job_id):
+    """Read a job's shared state, or None if no such job exists."""
+    try:
+        return orjson.loads(_job_path(job_id).read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+
+def _prune_finished_jobs():
+    """Drop the oldest finished job files so the directory stays bounded."""
+    finished = []
+    for path in JOBS_DIR.glob("*.json"):
+        try:
+            job = orjson.loads(path.read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            continue
+        if job.get("status") in ("done", "failed"):
+            finished.append((path.stat().st_mtime, path))
+    if len(finished) > MAX_FINISHED_JOBS:
+        finished.sort()
+        for _, path in finished[:-MAX_FINISHED_JOBS]:
+            path.unlink(missing_ok=True)
+
+
+async def get_vector_store():
+    """
+    Get the current vector store for this worker.
+
+    Uploads may land on a different Uvicorn worker, so the in-process
+    store is refreshed from the shared on-disk index whenever the
+    pointer names a newer content hash.
+
+    Returns:
+        FAISS: Vector store instance, or None if no PDF was ingested
+    """
+    global vector_store, current_pdf, current_index_hash
+
+    pointer = await asyncio.to_thread(_read_latest_pointer)
+    if pointer is not None and pointer["hash"] != current_index_hash:
+        store = await asyncio.to_thread(
+            load_vector_store, str(INDEX_CACHE_DIR / pointer["hash"])
+        )
+        if store is not None:
+            async with vector_store_lock:
+                vector_store = store
+                current_pdf = pointer["filename"]
+                current_index_hash = pointer["hash"]
+                # Cached query results refer to the previous PDF
+                clear_query_cache()
+
+    async with vector_store_lock:
+        return vector_store
+
+
+async def record_history(item, session_id):
+    """Append a conversation turn to Redis or the in-process fallback."""
+    if redis_client is not None:
+        key = f"history:{session_id}"
+        await redis_client.lpush(key, orjson.dumps(item._asdict()))
+        await redis_client.ltrim(key, 0, HISTORY_LIMIT - 1)
+    else:
+        async with history_lock:
+            history = conversation_histories.get(session_id)
+            if history is None:
+                history = conversation_histories[session_id] = deque(maxlen=HISTORY_LIMIT)
+            else:
+                conversation_histories.move_to_end(session_id)
+            history.append(item)
+
+            # Evict least recently used sessions so arbitrary session
+            # ids can't grow the fallback without bound
+            while len(conversation_histories) > MAX_SESSIONS:
+                conversation_histories.popitem(last=False)
+
+
+async def read_history(session_id):
+    """Read a session's conversation turns, oldest first."""
+    if redis_client is not None:
+        raw = await redis_client.lrange(f"history:{session_id}", 0, -1)
+        return [orjson.loads(entry) for entry in reversed(raw)]
+    async with history_lock:
+        history = conversation_histories.get(session_id)
+        if history is None:
+            return []
+        conversation_histories.move_to_end(session_id)
+        return [item._asdict() for item in history]
+
+
+async def clear_session_history(session_id):
+    """Clear one session's conversation history."""
+    if redis_client is not None:
+        await redis_client.delete(f"history:{session_id}")
+    else:
+        async with history_lock:
+            conversation_histories.pop(session_id, None)
+
+
+async def clear_all_history():
+    """Clear every session's history (a new PDF invalidates all of it)."""
+    if redis_client is not None:
+        async for key in redis_client.scan_iter("history:*"):
+            await redis_client.delete(key)
+    else:
+        async with history_lock:
+            conversation_histories.clear()
 
 
 # Pydantic models
@@ -54,11 +250,15 @@ class QuestionRequest(BaseModel):
     mode: str = "default"
 
 
-class HistoryItem(BaseModel):
-    question: str
-    answer: str
-    mode: str
-    timestamp: str
+class BatchQuestionRequest(BaseModel):
+    questions: List[QuestionRequest]
+
+
+@app.on_event("startup")
+async def warm_up_embeddings():
+    """Load the embedding model so the first upload doesn't pay the warm-up."""
+    await asyncio.to_thread(get_embeddings)
+    print("✓ Embedding model loaded")
 
 
 @app.get("/")
@@ -73,120 +273,209 @@ async def get_modes():
     return {"modes": get_available_modes()}
 
 
-@app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
+async def ingest_pdf(file_path, filename, content_hash, job):
     """
-    Upload and process a PDF file.
-    
+    Background task: load a saved PDF and build its vector store.
+
+    Runs the blocking parsing/embedding work in a worker thread so the
+    event loop keeps serving other requests. Built indexes are cached on
+    disk keyed by the PDF's content hash, so re-uploading the same file
+    skips parsing and embedding entirely. Job state is republished to
+    its shared file on every change so polls landing on other workers
+    see progress. Global state is only swapped in once the new vector
+    store is ready.
+
+    Args:
+        file_path (Path): Path to the saved PDF file
+        filename (str): Original filename of the upload
+        content_hash (str): Hash of the uploaded bytes
+        job (dict): State of the ingestion job to update
+    """
+    global vector_store, current_pdf, current_index_hash
+
+    cache_prefix = str(INDEX_CACHE_DIR / content_hash)
+
+    try:
+        # Re-uploads of a known PDF load the persisted index directly
+        new_store = await asyncio.to_thread(load_vector_store, cache_prefix)
+        if new_store is not None:
+            print("✓ Reusing cached vector store for this PDF")
+            job["cached"] = True
+        else:
+            print("📖 Loading PDF...")
+            job["status"] = "loading"
+            await asyncio.to_thread(_write_job, job)
+            documents = await asyncio.to_thread(load_pdf, str(file_path))
+            print(f"✓ Loaded {len(documents)} pages")
+
+            print("🔤 Creating embeddings (this may take a minute)...")
+            job["status"] = "embedding"
+            await asyncio.to_thread(_write_job, job)
+            new_store = await asyncio.to_thread(create_vector_store, documents)
+
+            # Write-through so the next upload of this PDF is instant
+            await asyncio.to_thread(save_vector_store, new_store, cache_prefix)
+            job["pages"] = len(documents)
+
+            print("✓ Vector store created")
+
+        # Swap in the new state only once the build succeeded, and
+        # publish the pointer so other workers pick up the new index
+        async with vector_store_lock:
+            vector_store = new_store
+            current_pdf = filename
+            current_index_hash = content_hash
+            # Cached query results refer to the previous PDF
+            clear_query_cache()
+        await asyncio.to_thread(_write_latest_pointer, content_hash, filename)
+
+        # Clear history when new PDF is uploaded
+        await clear_all_history()
+
+        job["status"] = "done"
+        await asyncio.to_thread(_write_job, job)
+
+        print(f"✅ Upload complete: {filename}")
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        job["status"] = "failed"
+        job["error"] = str(e)
+        await asyncio.to_thread(_write_job, job)
+
+
+@app.post("/upload-pdf", status_code=202)
+async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """
+    Upload a PDF file and process it in the background.
+
+    The file is streamed to disk and parsing/embedding is dispatched to a
+    background task, so the request returns immediately with a job id
+    that can be polled via GET /jobs/{job_id}.
+
     Args:
+        background_tasks: FastAPI background task queue
         file: PDF file to upload
-        
+
     Returns:
-        dict: Upload status and metadata
+        dict: Upload status and job id
     """
-    global vector_store, current_pdf
-    
     print(f"\n{'='*50}")
     print(f"📥 UPLOAD REQUEST RECEIVED")
     print(f"{'='*50}")
     print(f"File: {file.filename}")
     print(f"Content Type: {file.content_type}")
     print(f"Size: {file.size if hasattr(file, 'size') else 'unknown'}")
-    
+
+    # Validate file type
+    if not file.filename.endswith('.pdf'):
+        print("❌ Invalid file type")
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    print("✓ File type validated")
+
     try:
-        # Validate file type
-        if not file.filename.endswith('.pdf'):
-            print("❌ Invalid file type")
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
-        print("✓ File type validated")
-        
-        # Save uploaded file
+        # Stream uploaded file to disk in 1MB chunks, hashing as we go
         file_path = UPLOAD_DIR / file.filename
         print(f"💾 Saving to: {file_path}")
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
+        hasher = hashlib.blake2b(digest_size=16)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(1 << 20):
+                hasher.update(chunk)
+                await buffer.write(chunk)
+        content_hash = hasher.hexdigest()
+
         print("✓ File saved")
-        print("📖 Loading PDF...")
-        
-        # Load and process PDF
-        documents = load_pdf(str(file_path))
-        print(f"✓ Loaded {len(documents)} pages")
-        
-        print("🔤 Creating embeddings (this may take a minute)...")
-        
-        # Create vector store
-        vector_store = create_vector_store(documents)
-        current_pdf = file.filename
-        
-        print("✓ Vector store created")
-        
-        # Clear history when new PDF is uploaded
-        conversation_history.clear()
-        
-        print(f"✅ Upload complete: {file.filename}")
-        
-        return {
-            "status": "uploaded",
-            "filename": file.filename,
-            "pages": len(documents),
-            "message": "PDF processed successfully"
-        }
-    
+
     except Exception as e:
         print(f"❌ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error saving PDF: {str(e)}")
+
+    # Evict old finished jobs so the registry stays bounded
+    await asyncio.to_thread(_prune_finished_jobs)
+
+    # Queue background ingestion and return immediately
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "filename": file.filename,
+        "status": "queued"
+    }
+    await asyncio.to_thread(_write_job, job)
+    background_tasks.add_task(ingest_pdf, file_path, file.filename, content_hash, job)
+
+    return {
+        "status": "processing",
+        "job_id": job_id,
+        "filename": file.filename,
+        "message": "PDF accepted, processing in background"
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status of a PDF ingestion job.
+
+    Args:
+        job_id: Id returned by /upload-pdf
+
+    Returns:
+        dict: Job status and metadata
+    """
+    job = await asyncio.to_thread(_read_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @app.post("/ask")
-async def ask_question(request: QuestionRequest):
+async def ask_question(request: QuestionRequest, x_session_id: Optional[str] = Header(None)):
     """
     Ask a question about the uploaded PDF.
-    
+
     Args:
         request: Question and mode
-        
+        x_session_id: Optional session header partitioning the history
+
     Returns:
         dict: Answer and metadata
     """
-    global vector_store, conversation_history
-    
     try:
+        store = await get_vector_store()
+
         # Check if PDF is uploaded
-        if vector_store is None:
+        if store is None:
             raise HTTPException(
                 status_code=400,
                 detail="No PDF uploaded. Please upload a PDF first."
             )
-        
+
         # Validate mode
         if request.mode not in get_available_modes():
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid mode. Available modes: {get_available_modes()}"
             )
-        
-        # Search vector store for relevant context
-        relevant_docs = search_vector_store(vector_store, request.question, k=4)
-        
-        # Format context
-        context = format_context(relevant_docs)
-        
-        # Build query
-        full_query = build_query(context, request.question, request.mode)
-        
+
+        # Search vector store for relevant context (embedding + FAISS are
+        # blocking, so run them off the event loop)
+        relevant_docs = await asyncio.to_thread(
+            search_vector_store, store, request.question, 4
+        )
+
         # Get ScaleDown API key
         api_key = get_api_key()
-        
-        # Call answer generation with mode
-        answer = generate_answer(
-            api_key=api_key,
-            context=context,
-            prompt=full_query,
-            model="gpt-4o",
+
+        # Call answer generation with the retrieved sources directly
+        # (CPU-heavy, also off the loop)
+        answer = await asyncio.to_thread(
+            generate_answer,
+            api_key,
+            question=request.question,
+            sources=[doc.page_content for doc in relevant_docs],
             mode=request.mode
         )
         
@@ -197,13 +486,12 @@ async def ask_question(request: QuestionRequest):
         # answer is now a string containing the generated response
         
         # Save to history
-        history_item = {
-            "question": request.question,
-            "answer": answer,
-            "mode": request.mode,
-            "timestamp": datetime.now().isoformat()
-        }
-        conversation_history.append(history_item)
+        await record_history(HistoryItem(
+            question=request.question,
+            answer=answer,
+            mode=request.mode,
+            timestamp=datetime.now()
+        ), x_session_id or "default")
         
         return {
             "answer": answer,
@@ -211,41 +499,134 @@ async def ask_question(request: QuestionRequest):
             "sources": len(relevant_docs)
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
 
+@app.post("/ask-batch")
+async def ask_questions_batch(request: BatchQuestionRequest, x_session_id: Optional[str] = Header(None)):
+    """
+    Ask several questions about the uploaded PDF in one request.
+
+    All questions are embedded and searched as a single FAISS batch,
+    then answers are generated concurrently, so N questions cost far
+    less than N separate /ask calls.
+
+    Args:
+        request: List of questions and modes
+        x_session_id: Optional session header partitioning the history
+
+    Returns:
+        dict: List of answers in the same order as the questions
+    """
+    try:
+        store = await get_vector_store()
+
+        # Check if PDF is uploaded
+        if store is None:
+            raise HTTPException(
+                status_code=400,
+                detail="No PDF uploaded. Please upload a PDF first."
+            )
+
+        if not request.questions:
+            return {"answers": []}
+
+        # Validate modes up front
+        available_modes = get_available_modes()
+        for question in request.questions:
+            if question.mode not in available_modes:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid mode. Available modes: {available_modes}"
+                )
+
+        # One batched embed + FAISS search for all questions
+        docs_per_question = await asyncio.to_thread(
+            search_vector_store_batch,
+            store,
+            [q.question for q in request.questions],
+            4
+        )
+
+        # Get ScaleDown API key
+        api_key = get_api_key()
+
+        # Generate all answers concurrently
+        answers = await asyncio.gather(*[
+            asyncio.to_thread(
+                generate_answer,
+                api_key,
+                question=q.question,
+                sources=[doc.page_content for doc in docs],
+                mode=q.mode
+            )
+            for q, docs in zip(request.questions, docs_per_question)
+        ])
+
+        # Save each turn to history
+        session_id = x_session_id or "default"
+        for q, answer in zip(request.questions, answers):
+            await record_history(HistoryItem(
+                question=q.question,
+                answer=answer,
+                mode=q.mode,
+                timestamp=datetime.now()
+            ), session_id)
+
+        return {
+            "answers": [
+                {"answer": answer, "mode": q.mode, "sources": len(docs)}
+                for q, answer, docs in zip(
+                    request.questions, answers, docs_per_question
+                )
+            ]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing questions: {str(e)}")
+
+
 @app.get("/history")
-async def get_history():
+async def get_history(x_session_id: Optional[str] = Header(None)):
     """
     Get conversation history.
-    
+
+    Args:
+        x_session_id: Optional session header partitioning the history
+
     Returns:
         dict: List of conversation history items
     """
+    history = await read_history(x_session_id or "default")
     return {
-        "history": conversation_history,
+        "history": history,
         "pdf": current_pdf,
-        "total": len(conversation_history)
+        "total": len(history)
     }
 
 
 @app.delete("/history")
-async def clear_history():
+async def clear_history(x_session_id: Optional[str] = Header(None)):
     """Clear conversation history."""
-    global conversation_history
-    conversation_history.clear()
+    await clear_session_history(x_session_id or "default")
     return {"status": "history cleared"}
 
 
 @app.get("/status")
-async def get_status():
+async def get_status(x_session_id: Optional[str] = Header(None)):
     """Get current system status."""
+    store = await get_vector_store()
+    history = await read_history(x_session_id or "default")
     return {
         "pdf_loaded": current_pdf is not None,
         "current_pdf": current_pdf,
-        "vector_store_ready": vector_store is not None,
-        "history_count": len(conversation_history)
+        "vector_store_ready": store is not None,
+        "history_count": len(history)
     }
 
 
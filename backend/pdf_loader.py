@@ -3,18 +3,21 @@ PDF Loader Module
 Handles loading and processing PDF files into LangChain documents.
 """
 
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.document_loaders import PyPDFium2Loader
 
 
 def load_pdf(file_path):
     """
     Load a PDF file and extract text content.
-    
+
+    Uses pdfium (a native C++ parser) instead of pure-Python pypdf,
+    which is several times faster on text-heavy PDFs.
+
     Args:
         file_path (str): Path to the PDF file
-        
+
     Returns:
         list: List of Document objects containing page content
     """
-    loader = PyPDFLoader(file_path)
+    loader = PyPDFium2Loader(file_path)
     return loader.load()
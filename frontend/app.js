@@ -79,20 +79,29 @@ async function handleFileUpload(event) {
         }
         
         const data = await response.json();
-        
+
+        // Upload returns immediately; ingestion runs in the background,
+        // so poll the job until the vector store is actually ready
+        updateUploadStatus('🔄 Processing PDF (this may take 30-60 seconds)...', 'loading');
+        const job = await pollJob(data.job_id);
+
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'PDF processing failed');
+        }
+
         isPdfUploaded = true;
         updateUploadStatus(
-            `✅ ${data.filename} uploaded (${data.pages} pages)`, 
+            `✅ ${data.filename} uploaded${job.pages ? ` (${job.pages} pages)` : ''}`,
             'success'
         );
-        
+
         // Clear welcome message
         const chat = document.getElementById('chat');
         chat.innerHTML = '<div class="info-message">PDF loaded! Ask your first question below.</div>';
-        
+
         // Enable question input
         enableQuestionInput();
-        
+
     } catch (error) {
         let errorMsg = '❌ Upload failed: ';
         if (error.name === 'AbortError') {
@@ -111,6 +120,29 @@ async function handleFileUpload(event) {
     }
 }
 
+// Poll a background ingestion job until it finishes
+async function pollJob(jobId) {
+    const deadline = Date.now() + 300000; // 5 minute ceiling
+
+    while (Date.now() < deadline) {
+        const response = await fetch(`${API_URL}/jobs/${jobId}`);
+
+        if (!response.ok) {
+            throw new Error('Failed to check processing status');
+        }
+
+        const job = await response.json();
+
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+
+    throw new Error('Request timed out. PDF might be too large.');
+}
+
 // Update upload status
 function updateUploadStatus(message, type) {
     const statusEl = document.getElementById('uploadStatus');